@@ -210,7 +210,7 @@ class Cache:
         """
         Number of times a new object had to be calculated.
         """
-        return self._hits
+        return self._misses
 
     def __len__(self) -> int:
         """
@@ -1,8 +1,10 @@
 """Module for the CPU-optimization of numerical calculations using numba."""
+from functools import lru_cache
+
 import numba as nb
 import numpy as np
 from numba import jit, prange
-from typing import Sequence
+from typing import Sequence, Callable
 
 
 @nb.vectorize([nb.complex64(nb.float32), nb.complex128(nb.float64)])
@@ -83,3 +85,257 @@ def sum_run_length_encoded(array, result, separators):
         for i in range(result.shape[0]):
             for j in range(separators[x], separators[x + 1]):
                 result[i, x] += array[i, j]
+
+
+@jit(nopython=True, nogil=True, parallel=True, fastmath=True)
+def interpolate_table(array: np.ndarray, x: np.ndarray, table: np.ndarray, scale: float):
+    """
+    Linear interpolation in an evenly spaced table. Positions beyond the end of the table take the last value.
+
+    Parameters
+    ----------
+    array : 1d array
+        The interpolated values will be written to this array.
+    x : 1d array of float
+        The interpolation positions.
+    table : 1d array
+        The tabulated values, the first value is located at x = 0.
+    scale : float
+        The inverse of the spacing of the tabulated values.
+    """
+    n = table.shape[0]
+    for i in prange(x.shape[0]):
+        t = min(x[i] * scale, n - 1)
+        j = min(int(t), n - 2)
+        array[i] = table[j] + (table[j + 1] - table[j]) * (t - j)
+
+
+#: The radial order, the angular order and whether the harmonic is a cosine for each Cartesian aberration coefficient,
+#: in the order given by abtem.transfer.cartesian_symbols.
+_cartesian_terms = tuple((n, m, is_cos) for n in range(1, 6) for m in range((n + 1) % 2, n + 2, 2)
+                         for is_cos in ((True,) if m == 0 else (True, False)))
+
+
+#: The exponent beyond which the partial coherence envelopes are taken to vanish, exp(-50) is far below the resolution
+#: of single precision.
+_envelope_cutoff = 50.
+
+
+def _horner(coefficients: dict) -> str:
+    """
+    Internal function to generate the source of sum_n coefficients[n] * a^(n - 1) using Horner's scheme.
+    """
+    expression = ''
+    for n in range(max(coefficients), 0, -1):
+        if ' + ' in expression:
+            expression = '({}) * a'.format(expression)
+        elif expression:
+            expression = '{} * a'.format(expression)
+
+        if n in coefficients:
+            expression = '{} + {}'.format(expression, coefficients[n]) if expression else coefficients[n]
+
+    return '({})'.format(expression) if ' + ' in expression else expression
+
+
+def _evaluate_ctf_source(active: Sequence[int],
+                         has_aperture: bool,
+                         has_focal: bool,
+                         has_spatial: bool,
+                         has_gauss: bool,
+                         batch: bool) -> str:
+    """
+    Internal function to generate the source of a contrast transfer function kernel, only including the terms of the
+    given non-zero aberration coefficients and the given envelopes. If batch is True, the kernel takes 2d arrays of
+    coefficients and results, the aperture, the focal and Gaussian envelopes and the angular harmonics are evaluated
+    once per element and reused for every set of coefficients in the batch.
+    """
+    max_m = max([_cartesian_terms[j][1] for j in active], default=0)
+    coefficient = 'p[b, {}]' if batch else 'p[{}]'
+    result = 'array[b, i]' if batch else 'array[i]'
+    indent = ' ' * (12 if batch else 8)
+
+    lines = ['def evaluate_ctf(array, alpha, phi, p, wavelength, phase_shift, semiangle_cutoff, rolloff, '
+             'focal_spread, angular_spread, gaussian_spread):',
+             '    prefactor = 2 * np.pi / wavelength',
+             '    for i in prange(alpha.shape[0]):',
+             '        a = alpha[i]',
+             '        a2 = a * a',
+             '        envelope = 1.']
+
+    if has_aperture:
+        lines += ['        if a >= semiangle_cutoff:',
+                  '            envelope = 0.',
+                  '        elif (rolloff > 0.) & (a > semiangle_cutoff - rolloff):',
+                  '            envelope = .5 * (1 + np.cos(np.pi * (a - semiangle_cutoff + rolloff) / rolloff))']
+
+    # The exponentials are skipped where the envelopes vanish
+    if has_focal:
+        lines += ['        x = (.5 * np.pi / wavelength * focal_spread * a2) ** 2',
+                  '        envelope = 0. if x > {!r} else envelope * np.exp(-x)'.format(_envelope_cutoff)]
+
+    if has_gauss:
+        lines += ['        x = .5 * gaussian_spread ** 2 * a2 / wavelength ** 2',
+                  '        envelope = 0. if x > {!r} else envelope * np.exp(-x)'.format(_envelope_cutoff)]
+
+    # The phase is not evaluated where the envelope vanishes
+    if has_aperture or has_focal or has_gauss:
+        lines += ['        if envelope == 0.:']
+
+        # The batched results are zeroed before calling the kernel
+        if not batch:
+            lines += ['            array[i] = 0.']
+
+        lines += ['            continue']
+
+    # cos(m * phi) and sin(m * phi) from the Chebyshev recurrence
+    if max_m > 0:
+        lines += ['        c1 = np.cos(phi[i])',
+                  '        s1 = np.sin(phi[i])']
+
+    if max_m > 1:
+        lines += ['        c2 = 2 * c1 * c1 - 1.',
+                  '        s2 = 2 * c1 * s1']
+
+    for m in range(3, max_m + 1):
+        lines += ['        c{0} = 2 * c1 * c{1} - c{2}'.format(m, m - 1, m - 2),
+                  '        s{0} = 2 * c1 * s{1} - s{2}'.format(m, m - 1, m - 2)]
+
+    if batch:
+        lines += ['        for b in range(p.shape[0]):']
+
+    # Cmn * cos(m * (phi - phi_mn)) = Cmna * cos(m * phi) + Cmnb * sin(m * phi), summed for each radial order
+    cos_terms = {}
+    sin_terms = {}
+    for j in active:
+        n, m, is_cos = _cartesian_terms[j]
+
+        if m == 0:
+            cos_terms.setdefault(n, []).append(coefficient.format(j))
+            continue
+
+        cos_terms.setdefault(n, []).append('{} * {}{}'.format(coefficient.format(j), 'c' if is_cos else 's', m))
+
+        # m / (n + 1) * Cmn * sin(m * (phi - phi_mn)) = m / (n + 1) * (Cmna * sin(m * phi) - Cmnb * cos(m * phi))
+        term = '{} * {}{}'.format(coefficient.format(j), 's' if is_cos else 'c', m)
+        if m != n + 1:
+            term = '{!r} * {}'.format(m / (n + 1), term)
+        sin_terms.setdefault(n, []).append(('+ ' if is_cos else '- ') + term)
+
+    for n, terms in cos_terms.items():
+        lines += [indent + 'cos{} = {}'.format(n, ' + '.join(terms))]
+
+    for n, terms in sin_terms.items():
+        sin_terms[n] = ' '.join(terms).lstrip('+ ')
+
+    if has_spatial and cos_terms:
+        lines += [indent + 'dchi_dk = prefactor * {} * a'.format(
+            _horner({n: 'cos{}'.format(n) for n in cos_terms}))]
+
+        if sin_terms:
+            for n, terms in sin_terms.items():
+                lines += [indent + 'sin{} = {}'.format(n, terms)]
+
+            lines += [indent + 'dchi_dphi = prefactor * {} * a'.format(
+                _horner({n: 'sin{}'.format(n) for n in sin_terms}))]
+        else:
+            lines += [indent + 'dchi_dphi = 0.']
+
+        lines += [indent + 'x = (angular_spread / 2) ** 2 * (dchi_dk ** 2 + dchi_dphi ** 2)',
+                  indent + 'if x > {!r}:'.format(_envelope_cutoff),
+                  indent + '    ' + result + ' = 0.',
+                  indent + '    continue',
+                  indent + 'weight = envelope * np.exp(-x)']
+    else:
+        lines += [indent + 'weight = envelope']
+
+    if cos_terms:
+        lines += [indent + 'chi = prefactor * {} * a2 + phase_shift'.format(
+            _horner({n: '{} * cos{}'.format(1 / (n + 1), n) for n in cos_terms}))]
+    else:
+        lines += [indent + 'chi = phase_shift']
+
+    lines += [indent + result + ' = weight * (np.cos(chi) - 1.j * np.sin(chi))']
+    return '\n'.join(lines) + '\n'
+
+
+@lru_cache(maxsize=64)
+def _compile_evaluate_ctf(active: Sequence[int],
+                          has_aperture: bool,
+                          has_focal: bool,
+                          has_spatial: bool,
+                          has_gauss: bool,
+                          batch: bool) -> Callable:
+    """
+    Internal function to compile a contrast transfer function kernel specialized for the given non-zero aberration
+    coefficients and envelopes. The values of the coefficients are arguments of the kernel, hence a kernel is reused
+    as long as the same coefficients are non-zero.
+    """
+    namespace = {'np': np, 'prange': prange}
+    exec(_evaluate_ctf_source(active, has_aperture, has_focal, has_spatial, has_gauss, batch), namespace)
+    return jit(nopython=True, nogil=True, parallel=True, fastmath=True)(namespace['evaluate_ctf'])
+
+
+def evaluate_ctf(array: np.ndarray,
+                 alpha: np.ndarray,
+                 phi: np.ndarray,
+                 parameters: np.ndarray,
+                 active_orders: int,
+                 wavelength: float,
+                 phase_shift: float,
+                 semiangle_cutoff: float,
+                 rolloff: float,
+                 focal_spread: float,
+                 angular_spread: float,
+                 gaussian_spread: float):
+    """
+    Evaluate the contrast transfer function for a batch of aberration coefficients in a single pass. The phase
+    aberrations, the aperture and the partial coherence envelopes are evaluated per element, hence no intermediate
+    arrays are created. The kernel is generated and compiled for the non-zero aberration coefficients and the active
+    envelopes, hence the terms that vanish are never evaluated.
+
+    Parameters
+    ----------
+    array : 2d array of complex
+        The contrast transfer functions will be written to this array. The first dimension indexes the batch.
+    alpha : 1d array of float
+        The scattering angles [rad].
+    phi : 1d array of float
+        The azimuthal angles [rad].
+    parameters : 2d array of float
+        The Cartesian aberration coefficients in the order given by abtem.transfer.cartesian_symbols. The first
+        dimension indexes the batch.
+    active_orders : int
+        Bitmask of the radial orders with non-zero aberration coefficients, bit n - 1 is set for order n. Only the
+        GPU kernel uses the bitmask, the CPU kernel is specialized on the individual coefficients.
+    wavelength : float
+        The relativistic electron wavelength [Å].
+    phase_shift : float
+        A constant phase shift [rad].
+    semiangle_cutoff : float
+        The aperture semiangle cutoff [rad]. A negative value disables the aperture.
+    rolloff : float
+        Tapers the cutoff edge over the given angular range [rad].
+    focal_spread : float
+        The 1/e width of the focal spread [Å].
+    angular_spread : float
+        The 1/e width of the angular spread [rad].
+    gaussian_spread : float
+        The 1/e width of the Gaussian spread [Å].
+    """
+    active = tuple(int(j) for j in np.flatnonzero(np.any(parameters != 0., axis=0)))
+    has_aperture, has_focal, has_gauss = semiangle_cutoff >= 0., focal_spread > 0., gaussian_spread > 0.
+    batch = len(parameters) > 1
+    kernel = _compile_evaluate_ctf(active, has_aperture, has_focal, angular_spread > 0., has_gauss, batch)
+
+    if not batch:
+        array = array[0]
+        parameters = parameters[0]
+    elif has_aperture or has_focal or has_gauss:
+        # The batched kernel skips the elements where the envelope vanishes, zeroing them in a single contiguous pass
+        # is much faster than strided writes
+        array[:] = 0.
+
+    # The aperture edge is compared in the precision of the angles, as in abtem.transfer.CTF.evaluate_aperture
+    kernel(array, alpha, phi, parameters, wavelength, phase_shift, alpha.dtype.type(semiangle_cutoff), rolloff,
+           focal_spread, angular_spread, gaussian_spread)
@@ -1,5 +1,6 @@
 """Module for the GPU-optimization of numerical calculations using numba, CuPy, and CUDA."""
 import math
+from functools import lru_cache
 
 import cupy as cp
 from numba import cuda
@@ -138,3 +139,206 @@ def interpolate_bilinear_gpu(x, v, u, vw, uw):
         ''', 'resize_images_interpolate_bilinear'
     )(x, v, u, vw, uw, H, W, out_H * out_W, y)
     return y
+
+
+_complex_exponential_kernel = cp.ElementwiseKernel('T x', 'C y', '''
+    T s, c;
+    sincos(x, &s, &c);
+    y = C(c, s);
+    ''', 'complex_exponential')
+
+
+def complex_exponential_gpu(x):
+    """
+    Calculate the complex exponential. The sine and cosine share a single sincos evaluation and the result is written
+    directly without complex intermediates.
+    """
+    x = cp.asarray(x)
+
+    if x.dtype == cp.float32:
+        dtype = cp.complex64
+    else:
+        x = x.astype(cp.float64, copy=False)
+        dtype = cp.complex128
+
+    return _complex_exponential_kernel(x, cp.empty(x.shape, dtype=dtype))
+
+
+_interpolate_table_kernel = cp.ElementwiseKernel('T x, raw C table, T scale, int32 n', 'C y', '''
+    T t = min(x * scale, (T)(n - 1));
+    int j = min((int)t, n - 2);
+    y = table[j] + (table[j + 1] - table[j]) * (t - j);
+    ''', 'interpolate_table')
+
+
+def launch_interpolate_table(array, x, table, scale):
+    """
+    Linear interpolation in an evenly spaced table. See abtem.cpu_kernels.interpolate_table for a description of the
+    parameters.
+    """
+    _interpolate_table_kernel(x, table, x.dtype.type(scale), len(table), array)
+
+
+_evaluate_aperture_kernel = cp.ElementwiseKernel('T alpha, T semiangle_cutoff, T rolloff', 'T array', '''
+    if (alpha >= semiangle_cutoff) {
+        array = 0;
+    } else if ((rolloff > 0) && (alpha > semiangle_cutoff - rolloff)) {
+        array = .5 * (1 + cos((T)3.14159265358979323846 * (alpha - semiangle_cutoff + rolloff) / rolloff));
+    } else {
+        array = 1;
+    }
+    ''', 'evaluate_aperture')
+
+
+def launch_evaluate_aperture(alpha, semiangle_cutoff, rolloff):
+    """
+    Evaluate the aperture with a tapered edge in a single kernel launch.
+    """
+    dtype = alpha.dtype.type
+    return _evaluate_aperture_kernel(alpha, dtype(semiangle_cutoff), dtype(rolloff))
+
+
+_evaluate_ctf_source = r"""
+#include <cupy/complex.cuh>
+
+template<typename T, bool HasAperture, bool HasFocal, bool HasSpatial, bool HasGauss>
+__global__ void evaluate_ctf(complex<T>* array, const T* alpha, const T* phi, const T* coefficients,
+                             const int active_orders, const int n, const int batch, const T wavelength,
+                             const T phase_shift, const T semiangle_cutoff, const T rolloff, const T focal_spread,
+                             const T angular_spread, const T gaussian_spread) {
+    // The output offsets b * n + i are computed in 64 bit, a batch may exceed the range of int
+    const int i = blockDim.x * blockIdx.x + threadIdx.x;
+    if (i >= n) return;
+
+    const T pi = 3.14159265358979323846;
+    const T prefactor = 2 * pi / wavelength;
+    const T a = alpha[i];
+    const T a2 = a * a;
+
+    T envelope = 1;
+
+    if (HasAperture) {
+        if (a >= semiangle_cutoff) {
+            envelope = 0;
+        } else if ((rolloff > 0) && (a > semiangle_cutoff - rolloff)) {
+            envelope = .5 * (1 + cos(pi * (a - semiangle_cutoff + rolloff) / rolloff));
+        }
+    }
+
+    // The exponentials are skipped where the envelopes vanish
+    if (HasFocal) {
+        T x = .5 * pi / wavelength * focal_spread * a2;
+        x *= x;
+        envelope = (x > 50) ? 0 : envelope * exp(-x);
+    }
+
+    if (HasGauss) {
+        T x = .5 * gaussian_spread * gaussian_spread * a2 / (wavelength * wavelength);
+        envelope = (x > 50) ? 0 : envelope * exp(-x);
+    }
+
+    // The phase is not evaluated where the envelope vanishes
+    if ((HasAperture || HasFocal || HasGauss) && (envelope == 0)) {
+        for (int b = 0; b < batch; b++) array[(long long)b * n + i] = complex<T>(0, 0);
+        return;
+    }
+
+    // cos(m * phi) and sin(m * phi) from the Chebyshev recurrence
+    T s1, c1;
+    sincos(phi[i], &s1, &c1);
+    const T c2 = 2 * c1 * c1 - 1, s2 = 2 * c1 * s1;
+    const T c3 = 2 * c1 * c2 - c1, s3 = 2 * c1 * s2 - s1;
+    const T c4 = 2 * c1 * c3 - c2, s4 = 2 * c1 * s3 - s2;
+    const T c5 = 2 * c1 * c4 - c3, s5 = 2 * c1 * s4 - s3;
+    const T c6 = 2 * c1 * c5 - c4, s6 = 2 * c1 * s5 - s4;
+
+    // The envelopes and the harmonics are shared by all the coefficients in the batch
+    for (int b = 0; b < batch; b++) {
+        const T* p = coefficients + 25 * b;
+        T weight = envelope;
+
+        // Cmn * cos(m * (phi - phi_mn)) = Cmna * cos(m * phi) + Cmnb * sin(m * phi), summed for each radial order
+        T cos1 = 0, cos2 = 0, cos3 = 0, cos4 = 0, cos5 = 0;
+        if (active_orders & 1) cos1 = p[0] + p[1] * c2 + p[2] * s2;
+        if (active_orders & 2) cos2 = p[3] * c1 + p[4] * s1 + p[5] * c3 + p[6] * s3;
+        if (active_orders & 4) cos3 = p[7] + p[8] * c2 + p[9] * s2 + p[10] * c4 + p[11] * s4;
+        if (active_orders & 8) cos4 = p[12] * c1 + p[13] * s1 + p[14] * c3 + p[15] * s3 + p[16] * c5 + p[17] * s5;
+        if (active_orders & 16) cos5 = p[18] + p[19] * c2 + p[20] * s2 + p[21] * c4 + p[22] * s4 + p[23] * c6 +
+                                       p[24] * s6;
+
+        if (HasSpatial) {
+            // m / (n + 1) * Cmn * sin(m * (phi - phi_mn)), with Cmn * sin(m * (phi - phi_mn)) =
+            // Cmna * sin(m * phi) - Cmnb * cos(m * phi)
+            T sin1 = 0, sin2 = 0, sin3 = 0, sin4 = 0, sin5 = 0;
+            if (active_orders & 1) sin1 = p[1] * s2 - p[2] * c2;
+            if (active_orders & 2) sin2 = (p[3] * s1 - p[4] * c1) / 3 + p[5] * s3 - p[6] * c3;
+            if (active_orders & 4) sin3 = (p[8] * s2 - p[9] * c2) / 2 + p[10] * s4 - p[11] * c4;
+            if (active_orders & 8) sin4 = (p[12] * s1 - p[13] * c1) / 5 + 3 * (p[14] * s3 - p[15] * c3) / 5 +
+                                          p[16] * s5 - p[17] * c5;
+            if (active_orders & 16) sin5 = (p[19] * s2 - p[20] * c2) / 3 + 2 * (p[21] * s4 - p[22] * c4) / 3 +
+                                           p[23] * s6 - p[24] * c6;
+
+            T dchi_dk = prefactor * ((((cos5 * a + cos4) * a + cos3) * a + cos2) * a + cos1) * a;
+            T dchi_dphi = -prefactor * ((((sin5 * a + sin4) * a + sin3) * a + sin2) * a + sin1) * a;
+
+            T x = angular_spread * angular_spread / 4 * (dchi_dk * dchi_dk + dchi_dphi * dchi_dphi);
+            if (x > 50) {
+                array[(long long)b * n + i] = complex<T>(0, 0);
+                continue;
+            }
+            weight *= exp(-x);
+        }
+
+        T chi = ((((cos5 * a / 6 + cos4 / 5) * a + cos3 / 4) * a + cos2 / 3) * a + cos1 / 2) * a2;
+
+        chi = prefactor * chi + phase_shift;
+
+        T s, c;
+        sincos(chi, &s, &c);
+        array[(long long)b * n + i] = complex<T>(weight * c, -weight * s);
+    }
+}
+"""
+
+
+@lru_cache(maxsize=None)
+def _evaluate_ctf_kernel(dtype, has_aperture, has_focal, has_spatial, has_gauss):
+    """
+    Compile the contrast transfer function kernel specialized for the given partial coherence envelopes, the branches
+    of the other envelopes are removed at compile time.
+    """
+    name = 'evaluate_ctf<{},{},{},{},{}>'.format({'float32': 'float', 'float64': 'double'}[dtype],
+                                                 *('true' if flag else 'false' for flag in
+                                                   (has_aperture, has_focal, has_spatial, has_gauss)))
+    module = cp.RawModule(code=_evaluate_ctf_source, options=('-std=c++11',), name_expressions=(name,))
+    return module.get_function(name)
+
+
+def launch_evaluate_ctf(array, alpha, phi, parameters, active_orders, wavelength, phase_shift, semiangle_cutoff,
+                        rolloff, focal_spread, angular_spread, gaussian_spread):
+    """
+    Evaluate the contrast transfer function in a single kernel launch. See abtem.cpu_kernels.evaluate_ctf for a
+    description of the parameters.
+    """
+    # A grid without blocks is an invalid launch configuration
+    if alpha.size == 0:
+        return
+
+    if alpha.size > 2 ** 31 - 1:
+        raise ValueError('the number of angles must be less than 2 ** 31')
+
+    dtype = alpha.dtype.type
+    kernel = _evaluate_ctf_kernel(alpha.dtype.name, semiangle_cutoff >= 0., focal_spread > 0., angular_spread > 0.,
+                                  gaussian_spread > 0.)
+
+    alpha = cp.ascontiguousarray(alpha)
+    phi = cp.ascontiguousarray(phi)
+    parameters = cp.ascontiguousarray(cp.asarray(parameters, dtype=dtype))
+
+    threadsperblock = (256,)
+    blockspergrid = (math.ceil(alpha.size / threadsperblock[0]),)
+    kernel(blockspergrid, threadsperblock,
+           (array, alpha, phi, parameters, cp.int32(active_orders), cp.int32(alpha.size), cp.int32(len(parameters)),
+            dtype(wavelength),
+            dtype(phase_shift), dtype(semiangle_cutoff), dtype(rolloff), dtype(focal_spread), dtype(angular_spread),
+            dtype(gaussian_spread)))
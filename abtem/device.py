@@ -3,7 +3,8 @@ import numpy as np
 import psutil
 import pyfftw
 
-from abtem.cpu_kernels import abs2, complex_exponential, interpolate_radial_functions, sum_run_length_encoded
+from abtem.cpu_kernels import abs2, complex_exponential, interpolate_radial_functions, sum_run_length_encoded, \
+    evaluate_ctf, interpolate_table
 from abtem.interpolate import interpolate_bilinear_cpu
 import numbers
 
@@ -16,7 +17,8 @@ try:  # This should be the only place import cupy, to make it a non-essential de
     import cupyx.scipy.fft
     import cupyx.scipy.ndimage as ndimage
     from abtem.cuda_kernels import launch_interpolate_radial_functions, launch_sum_run_length_encoded, \
-        interpolate_bilinear_gpu, launch_batch_crop
+        interpolate_bilinear_gpu, launch_batch_crop, launch_evaluate_ctf, complex_exponential_gpu, \
+        launch_interpolate_table, launch_evaluate_aperture
 
     get_array_module = cp.get_array_module
 
@@ -52,12 +54,15 @@ try:  # This should be the only place import cupy, to make it a non-essential de
                      'ifft2': ifft2,
                      'fft2_convolve': fft2_convolve,
                      'pin_array': pin_array,
-                     'complex_exponential': lambda x: cp.exp(1.j * x),
+                     'complex_exponential': complex_exponential_gpu,
                      'abs2': lambda x: cp.abs(x) ** 2,
                      'interpolate_radial_functions': launch_interpolate_radial_functions,
                      'interpolate_bilinear': interpolate_bilinear_gpu,
                      'batch_crop': launch_batch_crop,
-                     'sum_run_length_encoded': launch_sum_run_length_encoded}
+                     'sum_run_length_encoded': launch_sum_run_length_encoded,
+                     'evaluate_ctf': launch_evaluate_ctf,
+                     'evaluate_aperture': launch_evaluate_aperture,
+                     'interpolate_table': launch_interpolate_table}
 
     asnumpy = cp.asnumpy
 
@@ -203,7 +208,9 @@ cpu_functions = {'fft2': fft2,
                  'interpolate_radial_functions': interpolate_radial_functions,
                  'batch_crop': batch_crop,
                  'interpolate_bilinear': interpolate_bilinear_cpu,
-                 'sum_run_length_encoded': sum_run_length_encoded}
+                 'sum_run_length_encoded': sum_run_length_encoded,
+                 'evaluate_ctf': evaluate_ctf,
+                 'interpolate_table': interpolate_table}
 
 
 def get_device_function(xp, name: str) -> Callable:
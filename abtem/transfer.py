@@ -1,16 +1,23 @@
 """Module to describe the contrast transfer function."""
 from collections import defaultdict
-from typing import Mapping, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Sequence, Union
 
 import numpy as np
 
 from abtem.measure import calibrations_from_grid
 from abtem.base_classes import HasAcceleratorMixin, HasEventMixin, Accelerator, watched_method, watched_property, Event, \
-    Grid
+    Grid, Cache, cached_method
 from abtem.device import get_array_module, get_device_function
 from abtem.measure import Measurement, Calibration
 from abtem.utils import energy2wavelength, spatial_frequencies, polar_coordinates
 
+try:  # numexpr is optional, it is only used to speed up the spatial envelope on the CPU
+    import numexpr
+except ImportError:
+    numexpr = None
+
 #: Symbols for the polar representation of all optical aberrations up to the fifth order.
 polar_symbols = ('C10', 'C12', 'phi12',
                  'C21', 'phi21', 'C23', 'phi23',
@@ -18,12 +25,152 @@ polar_symbols = ('C10', 'C12', 'phi12',
                  'C41', 'phi41', 'C43', 'phi43', 'C45', 'phi45',
                  'C50', 'C52', 'phi52', 'C54', 'phi54', 'C56', 'phi56')
 
+#: Symbols for the Cartesian representation of all optical aberrations up to the fifth order.
+cartesian_symbols = ('C10', 'C12a', 'C12b',
+                     'C21a', 'C21b', 'C23a', 'C23b',
+                     'C30', 'C32a', 'C32b', 'C34a', 'C34b',
+                     'C41a', 'C41b', 'C43a', 'C43b', 'C45a', 'C45b',
+                     'C50', 'C52a', 'C52b', 'C54a', 'C54b', 'C56a', 'C56b')
+
+#: The Cartesian aberration symbols grouped by radial order, paired with their angular order.
+_cartesian_orders = ((('C10', 0), ('C12a', 2), ('C12b', 2)),
+                     (('C21a', 1), ('C21b', 1), ('C23a', 3), ('C23b', 3)),
+                     (('C30', 0), ('C32a', 2), ('C32b', 2), ('C34a', 4), ('C34b', 4)),
+                     (('C41a', 1), ('C41b', 1), ('C43a', 3), ('C43b', 3), ('C45a', 5), ('C45b', 5)),
+                     (('C50', 0), ('C52a', 2), ('C52b', 2), ('C54a', 4), ('C54b', 4), ('C56a', 6), ('C56b', 6)))
+
+#: The symbols of the aberration magnitudes grouped by radial order.
+_order_symbols = tuple(tuple(symbol for symbol in polar_symbols if symbol[0] == 'C' and symbol[1] == str(n))
+                       for n in range(1, 6))
+
+#: The symbols of the aberration magnitudes that are not rotationally symmetric.
+_anisotropic_symbols = tuple(symbol for symbol in polar_symbols if (symbol[0] == 'C') and (symbol[-1] != '0'))
+
 #: Aliases for the most commonly used optical aberrations.
 polar_aliases = {'defocus': 'C10', 'astigmatism': 'C12', 'astigmatism_angle': 'phi12',
                  'coma': 'C21', 'coma_angle': 'phi21',
                  'Cs': 'C30',
                  'C5': 'C50'}
 
+#: The maximum phase difference between samples of the radial lookup table of rotationally symmetric aberrations.
+_radial_table_tolerance = 1e-2
+
+
+def _as_real_arrays(*arrays):
+    """
+    Internal function to convert the arguments to real arrays of a common precision. Single precision is used unless
+    an array is given in double precision. Python scalars do not take part in the choice unless all the arguments are
+    scalars, hence single precision arrays are never promoted by scalar angles or parameters.
+    """
+    xp = get_array_module(arrays[0])
+    weak = [type(array) in (int, float) for array in arrays]
+    arrays = [xp.asarray(array) for array in arrays]
+    typed = [array for array, is_weak in zip(arrays, weak) if not is_weak] or arrays
+    dtype = np.float64 if any(array.dtype == np.float64 for array in typed) else np.float32
+    return [array.astype(dtype, copy=False) for array in arrays]
+
+
+def _angular_harmonics(phi: Union[float, np.ndarray]):
+    """
+    Internal function returning a function for evaluating the harmonics cos(m * phi) and sin(m * phi). The harmonics
+    are generated on demand with the Chebyshev recurrence, such that only a single cosine and sine of phi is ever
+    evaluated.
+    """
+    xp = get_array_module(phi)
+    cos_m = [1.]
+    sin_m = [0.]
+
+    def harmonic(m):
+        if len(cos_m) == 1:
+            cos_m.append(xp.cos(phi))
+            sin_m.append(xp.sin(phi))
+
+        while len(cos_m) <= m:
+            cos_m.append(2 * cos_m[1] * cos_m[-1] - cos_m[-2])
+            sin_m.append(2 * cos_m[1] * sin_m[-1] - sin_m[-2])
+
+        return cos_m[m], sin_m[m]
+
+    return harmonic
+
+
+def _harmonic_series(alpha: np.ndarray, harmonic, terms, shape) -> np.ndarray:
+    """
+    Internal function to evaluate sum_n alpha^n sum_k c_nk * h_nk(phi), where the angular functions h_nk are harmonics
+    of phi. The series is accumulated in place using Horner's scheme, only a single buffer is used for the products of
+    the coefficients and the harmonics.
+
+    Parameters
+    ----------
+    alpha : array
+        The scattering angles.
+    harmonic : callable
+        Function returning the harmonics cos(m * phi) and sin(m * phi), see _angular_harmonics.
+    terms : list of list of tuples
+        The terms of the series for n = 1, 2, ...; each term is given as a coefficient, the angular order m and
+        whether the harmonic is a cosine (True) or a sine (False).
+    shape : tuple of int
+        The shape of the result.
+    """
+    xp = get_array_module(alpha)
+    array = xp.zeros(shape, dtype=alpha.dtype)
+    buffer = None
+
+    orders = [n for n, order_terms in enumerate(terms) if any(c != 0. for c, _, _ in order_terms)]
+    if not orders:
+        return array
+
+    for n in range(orders[-1], -1, -1):
+        if n < orders[-1]:
+            array *= alpha
+
+        for coefficient, m, is_cos in terms[n]:
+            if coefficient == 0.:
+                continue
+
+            if m == 0:
+                array += coefficient
+                continue
+
+            if buffer is None:
+                buffer = xp.empty(shape, dtype=alpha.dtype)
+
+            xp.multiply(harmonic(m)[0 if is_cos else 1], coefficient, out=buffer)
+            array += buffer
+
+    array *= alpha
+    return array
+
+
+def _harmonic_series_expression(alpha: np.ndarray, harmonic, terms, local_dict: dict, prefix: str) -> str:
+    """
+    Internal function to build a numexpr expression for the series evaluated by _harmonic_series. The harmonics and the
+    coefficients are added to local_dict as variables, hence the expression only depends on which terms are non-zero.
+    """
+    expression = ''
+    for n in range(len(terms) - 1, -1, -1):
+        order_terms = [expression] if expression else []
+
+        for k, (coefficient, m, is_cos) in enumerate(terms[n]):
+            if coefficient == 0.:
+                continue
+
+            name = '{}{}_{}'.format(prefix, n, k)
+            local_dict[name] = alpha.dtype.type(coefficient)
+
+            if m == 0:
+                order_terms.append(name)
+                continue
+
+            harmonic_name = '{}{}'.format('c' if is_cos else 's', m)
+            local_dict[harmonic_name] = harmonic(m)[0 if is_cos else 1]
+            order_terms.append('{} * {}'.format(name, harmonic_name))
+
+        if order_terms:
+            expression = '({}) * alpha'.format(' + '.join(order_terms))
+
+    return expression if expression else '0 * alpha'
+
 
 class CTF(HasAcceleratorMixin, HasEventMixin):
     """
@@ -97,39 +244,29 @@ class CTF(HasAcceleratorMixin, HasEventMixin):
         self._parameters = dict(zip(polar_symbols, [0.] * len(polar_symbols)))
         self._phase_shift = phase_shift
 
-        if parameters is None:
-            parameters = {}
+        self._polar_coordinates_cache = Cache(1)
 
+        # The derived parameters are initialized by the notification of set_parameters below
+        self._event.observe(self._update_derived_parameters)
+
+        # A new dict is built, hence the mapping of the caller is never modified and read-only mappings are accepted
+        parameters = dict(parameters or {})
         parameters.update(kwargs)
         self.set_parameters(parameters)
 
-        def parametrization_property(key):
-
-            def getter(self):
-                return self._parameters[key]
-
-            def setter(self, value):
-                old = getattr(self, key)
-                self._parameters[key] = value
-                self.event.notify({'notifier': self, 'name': key, 'change': old != value})
-
-            return property(getter, setter)
-
-        for symbol in polar_symbols:
-            setattr(self.__class__, symbol, parametrization_property(symbol))
-
-        for key, value in polar_aliases.items():
-            if key != 'defocus':
-                setattr(self.__class__, key, parametrization_property(value))
-
     @property
     def nyquist_sampling(self):
         return 1 / (4 * self.semiangle_cutoff / self.wavelength * 1e-3)
 
     @property
-    def parameters(self):
-        """The parameters."""
-        return self._parameters
+    def parameters(self) -> Mapping[str, float]:
+        """The parameters (read-only), use set_parameters or the properties of the aberrations to change them."""
+        return MappingProxyType(self._parameters)
+
+    @property
+    def cartesian_parameters(self) -> Mapping[str, float]:
+        """The aberration coefficients in the Cartesian representation (read-only)."""
+        return MappingProxyType(self._cartesian_parameters)
 
     @property
     def defocus(self) -> float:
@@ -201,6 +338,11 @@ class CTF(HasAcceleratorMixin, HasEventMixin):
             Mapping from aberration symbols to their corresponding values.
         """
 
+        # All the symbols are checked before any is written, the derived parameters are only updated on success
+        for symbol in parameters.keys():
+            if (symbol not in self._parameters.keys()) and (symbol not in polar_aliases.keys()):
+                raise ValueError('{} not a recognized parameter'.format(symbol))
+
         for symbol, value in parameters.items():
             if symbol in self._parameters.keys():
                 self._parameters[symbol] = value
@@ -208,11 +350,8 @@ class CTF(HasAcceleratorMixin, HasEventMixin):
             elif symbol == 'defocus':
                 self._parameters[polar_aliases[symbol]] = -value
 
-            elif symbol in polar_aliases.keys():
-                self._parameters[polar_aliases[symbol]] = value
-
             else:
-                raise ValueError('{} not a recognized parameter'.format(symbol))
+                self._parameters[polar_aliases[symbol]] = value
 
         return parameters
 
@@ -221,99 +360,102 @@ class CTF(HasAcceleratorMixin, HasEventMixin):
                           phi: Union[float, np.ndarray] = None) -> Union[float, np.ndarray]:
 
         xp = get_array_module(alpha)
+        alpha, = _as_real_arrays(alpha)
         semiangle_cutoff = self.semiangle_cutoff / 1000
 
         if self.semiangle_cutoff == xp.inf:
             return xp.ones_like(alpha)
 
+        if xp is not np:
+            # The GPU evaluates the aperture in a single kernel launch
+            evaluate_aperture = get_device_function(xp, 'evaluate_aperture')
+            return evaluate_aperture(alpha, semiangle_cutoff, self.rolloff / 1000.)
+
         if self.rolloff > 0.:
             rolloff = self.rolloff / 1000.  # * semiangle_cutoff
-            array = .5 * (1 + xp.cos(np.pi * (alpha - semiangle_cutoff + rolloff) / rolloff))
+            array = xp.ones_like(alpha)
+            # The cosine taper is only evaluated within the rolloff band
+            taper = alpha > semiangle_cutoff - rolloff
+            array[taper] = .5 * (1 + xp.cos(np.pi * (alpha[taper] - semiangle_cutoff + rolloff) / rolloff))
             array[alpha > semiangle_cutoff] = 0.
-            array = xp.where(alpha > semiangle_cutoff - rolloff, array, xp.ones_like(alpha, dtype=xp.float32))
         else:
-            array = xp.array(alpha < semiangle_cutoff).astype(xp.float32)
+            array = (alpha < semiangle_cutoff).astype(alpha.dtype, copy=False)
         return array
 
     def evaluate_temporal_envelope(self, alpha: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
         xp = get_array_module(alpha)
-        return xp.exp(- (.5 * xp.pi / self.wavelength * self.focal_spread * alpha ** 2) ** 2).astype(xp.float32)
+        alpha, = _as_real_arrays(alpha)
+        x = float(.5 * np.pi / self.wavelength * self.focal_spread) * alpha * alpha
+        return xp.exp(- x * x)
 
     def evaluate_gaussian_envelope(self, alpha: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
         xp = get_array_module(alpha)
-        return xp.exp(- .5 * self.gaussian_spread ** 2 * alpha ** 2 / self.wavelength ** 2)
+        alpha, = _as_real_arrays(alpha)
+        return xp.exp(float(- .5 * self.gaussian_spread ** 2 / self.wavelength ** 2) * alpha * alpha)
 
     def evaluate_spatial_envelope(self, alpha: Union[float, np.ndarray], phi: Union[float, np.ndarray]) -> \
             Union[float, np.ndarray]:
         xp = get_array_module(alpha)
-        p = self.parameters
-        dchi_dk = 2 * xp.pi / self.wavelength * (
-                (p['C12'] * xp.cos(2. * (phi - p['phi12'])) + p['C10']) * alpha +
-                (p['C23'] * xp.cos(3. * (phi - p['phi23'])) +
-                 p['C21'] * xp.cos(1. * (phi - p['phi21']))) * alpha ** 2 +
-                (p['C34'] * xp.cos(4. * (phi - p['phi34'])) +
-                 p['C32'] * xp.cos(2. * (phi - p['phi32'])) + p['C30']) * alpha ** 3 +
-                (p['C45'] * xp.cos(5. * (phi - p['phi45'])) +
-                 p['C43'] * xp.cos(3. * (phi - p['phi43'])) +
-                 p['C41'] * xp.cos(1. * (phi - p['phi41']))) * alpha ** 4 +
-                (p['C56'] * xp.cos(6. * (phi - p['phi56'])) +
-                 p['C54'] * xp.cos(4. * (phi - p['phi54'])) +
-                 p['C52'] * xp.cos(2. * (phi - p['phi52'])) + p['C50']) * alpha ** 5)
-
-        dchi_dphi = -2 * xp.pi / self.wavelength * (
-                1 / 2. * (2. * p['C12'] * xp.sin(2. * (phi - p['phi12']))) * alpha +
-                1 / 3. * (3. * p['C23'] * xp.sin(3. * (phi - p['phi23'])) +
-                          1. * p['C21'] * xp.sin(1. * (phi - p['phi21']))) * alpha ** 2 +
-                1 / 4. * (4. * p['C34'] * xp.sin(4. * (phi - p['phi34'])) +
-                          2. * p['C32'] * xp.sin(2. * (phi - p['phi32']))) * alpha ** 3 +
-                1 / 5. * (5. * p['C45'] * xp.sin(5. * (phi - p['phi45'])) +
-                          3. * p['C43'] * xp.sin(3. * (phi - p['phi43'])) +
-                          1. * p['C41'] * xp.sin(1. * (phi - p['phi41']))) * alpha ** 4 +
-                1 / 6. * (6. * p['C56'] * xp.sin(6. * (phi - p['phi56'])) +
-                          4. * p['C54'] * xp.sin(4. * (phi - p['phi54'])) +
-                          2. * p['C52'] * xp.sin(2. * (phi - p['phi52']))) * alpha ** 5)
-
-        return xp.exp(-xp.sign(self.angular_spread) * (self.angular_spread / 2 / 1000) ** 2 *
-                      (dchi_dk ** 2 + dchi_dphi ** 2))
+        p = self._cartesian_parameters
+        alpha, phi = _as_real_arrays(alpha, phi)
+        harmonic = _angular_harmonics(phi)
+        shape = xp.broadcast(alpha, phi).shape
+
+        # dchi / dk = 2 pi / lambda sum_n alpha^n sum_m (Cnma cos(m phi) + Cnmb sin(m phi))
+        dchi_dk_terms = [[(float(p[symbol]), m, symbol[-1] != 'b') for symbol, m in symbols]
+                         for symbols in _cartesian_orders]
+
+        # dchi / dphi / alpha = 2 pi / lambda sum_n alpha^n sum_m m / (n + 1) (Cnmb cos(m phi) - Cnma sin(m phi))
+        # dchi / dphi vanishes for rotationally symmetric aberrations
+        if not self._isotropic:
+            dchi_dphi_terms = [[(float(m / (n + 1) * p[symbol] * (1 if symbol[-1] == 'b' else -1)), m,
+                                 symbol[-1] == 'b') for symbol, m in symbols]
+                               for n, symbols in enumerate(_cartesian_orders, 1)]
+        else:
+            dchi_dphi_terms = None
+
+        prefactor = 2 * np.pi / self.wavelength * self.angular_spread / 2 / 1000
+        prefactor = float(-np.sign(self.angular_spread) * prefactor ** 2)
+
+        # numexpr only pays off when its blocks are evaluated on several threads, the NumPy path is as fast otherwise
+        if (numexpr is not None) and (xp is np) and (numexpr.get_num_threads() > 1):
+            # The series, the squares and the exponential are evaluated in cache sized blocks without temporary arrays
+            local_dict = {'alpha': np.broadcast_to(alpha, shape), 'prefactor': alpha.dtype.type(prefactor)}
+            dchi_dk = _harmonic_series_expression(alpha, harmonic, dchi_dk_terms, local_dict, 'k')
+            expression = '({}) ** 2'.format(dchi_dk)
+
+            if dchi_dphi_terms is not None:
+                dchi_dphi = _harmonic_series_expression(alpha, harmonic, dchi_dphi_terms, local_dict, 'f')
+                expression = '{} + ({}) ** 2'.format(expression, dchi_dphi)
+
+            return numexpr.evaluate('exp(prefactor * ({}))'.format(expression), local_dict=local_dict)
+
+        dchi_dk = _harmonic_series(alpha, harmonic, dchi_dk_terms, shape)
+        dchi_dk *= dchi_dk
+
+        if dchi_dphi_terms is not None:
+            dchi_dphi = _harmonic_series(alpha, harmonic, dchi_dphi_terms, shape)
+            dchi_dphi *= dchi_dphi
+            dchi_dk += dchi_dphi
+
+        dchi_dk *= prefactor
+        return xp.exp(dchi_dk, out=dchi_dk)
 
     def evaluate_chi(self, alpha: Union[float, np.ndarray], phi: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
         xp = get_array_module(alpha)
-        p = self.parameters
-
-        alpha2 = alpha ** 2
-        alpha = xp.array(alpha)
-
-        array = xp.zeros(alpha.shape, dtype=np.float32)
-        if any([p[symbol] != 0. for symbol in ('C10', 'C12', 'phi12')]):
-            array += (1 / 2 * alpha2 *
-                      (p['C10'] +
-                       p['C12'] * xp.cos(2 * (phi - p['phi12']))))
-
-        if any([p[symbol] != 0. for symbol in ('C21', 'phi21', 'C23', 'phi23')]):
-            array += (1 / 3 * alpha2 * alpha *
-                      (p['C21'] * xp.cos(phi - p['phi21']) +
-                       p['C23'] * xp.cos(3 * (phi - p['phi23']))))
-
-        if any([p[symbol] != 0. for symbol in ('C30', 'C32', 'phi32', 'C34', 'phi34')]):
-            array += (1 / 4 * alpha2 ** 2 *
-                      (p['C30'] +
-                       p['C32'] * xp.cos(2 * (phi - p['phi32'])) +
-                       p['C34'] * xp.cos(4 * (phi - p['phi34']))))
-
-        if any([p[symbol] != 0. for symbol in ('C41', 'phi41', 'C43', 'phi43', 'C45', 'phi41')]):
-            array += (1 / 5 * alpha2 ** 2 * alpha *
-                      (p['C41'] * xp.cos((phi - p['phi41'])) +
-                       p['C43'] * xp.cos(3 * (phi - p['phi43'])) +
-                       p['C45'] * xp.cos(5 * (phi - p['phi45']))))
-
-        if any([p[symbol] != 0. for symbol in ('C50', 'C52', 'phi52', 'C54', 'phi54', 'C56', 'phi56')]):
-            array += (1 / 6 * alpha2 ** 3 *
-                      (p['C50'] +
-                       p['C52'] * xp.cos(2 * (phi - p['phi52'])) +
-                       p['C54'] * xp.cos(4 * (phi - p['phi54'])) +
-                       p['C56'] * xp.cos(6 * (phi - p['phi56']))))
-
-        array = 2 * xp.pi / self.wavelength * array + self._phase_shift
+        p = self._cartesian_parameters
+        alpha, phi = _as_real_arrays(alpha, phi)
+        harmonic = _angular_harmonics(phi)
+        shape = xp.broadcast(alpha, phi).shape
+
+        # chi = 2 pi / lambda sum_n alpha^(n + 1) / (n + 1) sum_m (Cnma cos(m phi) + Cnmb sin(m phi))
+        terms = [[(float(p[symbol] / (n + 1)), m, symbol[-1] != 'b') for symbol, m in symbols]
+                 for n, symbols in enumerate(_cartesian_orders, 1)]
+        array = _harmonic_series(alpha, harmonic, terms, shape)
+
+        array *= alpha
+        array *= float(2 * np.pi / self.wavelength)
+        array += float(self._phase_shift)
         return array
 
     def evaluate_aberrations(self, alpha: Union[float, np.ndarray], phi: Union[float, np.ndarray]) -> \
@@ -322,38 +464,176 @@ class CTF(HasAcceleratorMixin, HasEventMixin):
         complex_exponential = get_device_function(xp, 'complex_exponential')
         return complex_exponential(-self.evaluate_chi(alpha, phi))
 
-    def evaluate(self, alpha: Union[float, np.ndarray], phi: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
-        array = self.evaluate_aberrations(alpha, phi)
+    def _update_derived_parameters(self, *args):
+        """
+        Update the Cartesian aberration coefficients and the flags of the non-zero aberrations. These are updated
+        whenever the event is notified, hence they are never recomputed when evaluating the contrast transfer function.
+        """
+        self._cartesian_parameters = polar2cartesian(self._parameters)
+        self._cartesian_array = np.array([self._cartesian_parameters[symbol] for symbol in cartesian_symbols],
+                                         dtype=np.float64)
+
+        # Bitmask of the radial orders with non-zero aberration coefficients, bit n - 1 is set for order n
+        self._active_orders = sum(1 << n for n, symbols in enumerate(_order_symbols)
+                                  if any(self._parameters[symbol] != 0. for symbol in symbols))
+        self._isotropic = not any(self._parameters[symbol] != 0. for symbol in _anisotropic_symbols)
+
+    def _evaluate_radial(self, alpha: np.ndarray) -> Union[np.ndarray, None]:
+        """
+        Evaluate a rotationally symmetric contrast transfer function by linear interpolation in a radial lookup table.
+
+        The table is sampled such that the phase changes by at most _radial_table_tolerance between samples, hence
+        the interpolation error is comparable to the single precision rounding error of the phase. The envelopes are
+        sampled at least four times finer than the array. None is returned if the table would not be much smaller than
+        the given array, or if the angles are given in double precision.
+        """
+        xp = get_array_module(alpha)
+        p = self._parameters
+
+        if (alpha.ndim == 0) or (alpha.dtype != np.float32):
+            return None
 
         if self.semiangle_cutoff < np.inf:
-            array *= self.evaluate_aperture(alpha, phi)
+            max_alpha = self.semiangle_cutoff / 1000.
+        else:
+            max_alpha = float(alpha.max()) if alpha.size > 0 else 0.
+
+        max_dchi_dalpha = 2 * np.pi / self.wavelength * (abs(p['C10']) * max_alpha + abs(p['C30']) * max_alpha ** 3 +
+                                                         abs(p['C50']) * max_alpha ** 5)
+
+        n = max(int(np.ceil(max_alpha * max_dchi_dalpha / _radial_table_tolerance)), 4 * max(alpha.shape)) + 1
+        if (max_alpha == 0.) or (n > alpha.size // 8):
+            return None
+
+        alpha_table = xp.linspace(0, max_alpha, n, dtype=np.float64)
+        table = self.evaluate_aberrations(alpha_table, 0.)
 
         if self.focal_spread > 0.:
-            array *= self.evaluate_temporal_envelope(alpha)
+            table *= self.evaluate_temporal_envelope(alpha_table)
 
         if self.angular_spread > 0.:
-            array *= self.evaluate_spatial_envelope(alpha, phi)
+            table *= self.evaluate_spatial_envelope(alpha_table, 0.)
 
         if self.gaussian_spread > 0.:
-            array *= self.evaluate_gaussian_envelope(alpha)
+            table *= self.evaluate_gaussian_envelope(alpha_table)
+
+        hard_cutoff = (self.semiangle_cutoff < np.inf) and (self.rolloff == 0.)
+        if (self.semiangle_cutoff < np.inf) and not hard_cutoff:
+            table *= self.evaluate_aperture(alpha_table)
+
+        interpolate_table = get_device_function(xp, 'interpolate_table')
+        array = xp.empty(alpha.shape, dtype=np.complex64)
+        interpolate_table(array.ravel(), alpha.ravel(), table.astype(np.complex64), (n - 1) / max_alpha)
+
+        if hard_cutoff:
+            array *= alpha < max_alpha
 
         return array
 
-    def _polar_coordinates(self, gpts=None, extent=None, sampling=None, xp=np):
-        grid = Grid(gpts=gpts, extent=extent, sampling=sampling)
+    def evaluate(self, alpha: Union[float, np.ndarray], phi: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        xp = get_array_module(alpha)
+        alpha, phi = xp.broadcast_arrays(*_as_real_arrays(alpha, phi))
 
-        gpts = grid.gpts
-        sampling = grid.sampling
+        if self._isotropic:
+            array = self._evaluate_radial(alpha)
+            if array is not None:
+                return array
 
+        array = xp.empty(alpha.shape, dtype=np.result_type(alpha.dtype, np.complex64))
+        self._evaluate_fused(array, alpha, phi, self._cartesian_array[None], self._active_orders)
+        return array
+
+    def _evaluate_fused(self, array, alpha, phi, cartesian, active_orders):
+        xp = get_array_module(alpha)
+        evaluate_ctf = get_device_function(xp, 'evaluate_ctf')
+
+        if self.semiangle_cutoff < np.inf:
+            semiangle_cutoff = self.semiangle_cutoff / 1000.
+        else:
+            semiangle_cutoff = -1.
+
+        # The aberrations, the aperture and the envelopes are evaluated in a single pass.
+        evaluate_ctf(array.reshape((len(cartesian), -1)), alpha.ravel(), phi.ravel(), cartesian, active_orders,
+                     self.wavelength, self._phase_shift, semiangle_cutoff, self.rolloff / 1000., self.focal_spread,
+                     self.angular_spread / 1000., self.gaussian_spread)
+
+    def evaluate_batch(self,
+                       alpha: np.ndarray,
+                       phi: np.ndarray,
+                       parameters: Mapping[str, Sequence[float]],
+                       out: np.ndarray = None) -> np.ndarray:
+        """
+        Evaluate the contrast transfer function for a batch of aberration coefficients, e.g. a focal series. The
+        aperture, the focal and Gaussian envelopes and the angular harmonics are only evaluated once for the batch.
+
+        Parameters
+        ----------
+        alpha : array
+            The scattering angles [rad].
+        phi : array
+            The azimuthal angles [rad].
+        parameters : dict
+            Mapping from aberration symbols to sequences of values, one for each item of the batch. The aberrations that
+            are not given take the values of this contrast transfer function.
+        out : array, optional
+            Complex array of shape (batch,) + shape of the angles the result is written to, in the precision of the
+            angles. The same array may be reused across calls.
+
+        Returns
+        -------
+        array
+            The contrast transfer functions, the first dimension indexes the batch.
+        """
+        xp = get_array_module(alpha)
+        alpha, phi = xp.broadcast_arrays(*_as_real_arrays(alpha, phi))
+
+        batch = max([np.size(values) for values in parameters.values()], default=1)
+        polar = {symbol: np.full(batch, value, dtype=np.float64) for symbol, value in self._parameters.items()}
+
+        for symbol, values in parameters.items():
+            values = np.broadcast_to(np.asarray(values, dtype=np.float64), (batch,))
+
+            if symbol in polar.keys():
+                polar[symbol] = values
+
+            elif symbol == 'defocus':
+                polar[polar_aliases[symbol]] = -values
+
+            elif symbol in polar_aliases.keys():
+                polar[polar_aliases[symbol]] = values
+
+            else:
+                raise ValueError('{} not a recognized parameter'.format(symbol))
+
+        cartesian = polar2cartesian(polar)
+        cartesian = np.stack([cartesian[symbol] for symbol in cartesian_symbols], axis=1)
+
+        nonzero = dict(zip(cartesian_symbols, np.any(cartesian != 0., axis=0)))
+        active_orders = sum(1 << n for n, symbols in enumerate(_cartesian_orders)
+                            if any(nonzero[symbol] for symbol, _ in symbols))
+
+        shape = (batch,) + alpha.shape
+        dtype = np.result_type(alpha.dtype, np.complex64)
+        if out is None:
+            out = xp.empty(shape, dtype=dtype)
+        elif (out.shape != shape) or (out.dtype != dtype) or not out.flags.c_contiguous:
+            raise ValueError('out must be a contiguous {} array of shape {}'.format(np.dtype(dtype).name, shape))
+
+        self._evaluate_fused(out, alpha, phi, cartesian, active_orders)
+        return out
+
+    @cached_method('_polar_coordinates_cache')
+    def _polar_coordinates(self, gpts, sampling, wavelength, xp):
         kx, ky = spatial_frequencies(gpts, sampling)
-        kx = kx.reshape((1, -1, 1))
-        ky = ky.reshape((1, 1, -1))
-        kx = xp.asarray(kx)
-        ky = xp.asarray(ky)
-        return polar_coordinates(xp.asarray(kx * self.wavelength), xp.asarray(ky * self.wavelength))
+        kx = xp.asarray(kx * wavelength, dtype=np.float32)
+        ky = xp.asarray(ky * wavelength, dtype=np.float32)
+        return polar_coordinates(kx, ky)
 
     def evaluate_on_grid(self, gpts=None, extent=None, sampling=None, xp=np):
-        return self.evaluate(*self._polar_coordinates(gpts, extent, sampling, xp))
+        grid = Grid(gpts=gpts, extent=extent, sampling=sampling)
+        # The polar coordinates only depend on the grid and the wavelength, they are reused between evaluations.
+        alpha, phi = self._polar_coordinates(grid.gpts, grid.sampling, self.wavelength, xp)
+        return self.evaluate(alpha, phi)
 
     def profiles(self, max_semiangle: float = None, phi: float = 0., reciprocal_units: bool = False):
         if max_semiangle is None:
@@ -512,6 +792,39 @@ class CTF(HasAcceleratorMixin, HasEventMixin):
                               parameters=parameters)
 
 
+@lru_cache(maxsize=None)
+def _make_property(key: str) -> property:
+    """
+    Internal function to create the property of an aberration coefficient. The properties are cached by symbol, hence
+    the aliases share the property of the symbol they refer to.
+    """
+
+    def getter(self):
+        return self._parameters[key]
+
+    def setter(self, value):
+        old = getattr(self, key)
+        self._parameters[key] = value
+        self.event.notify({'notifier': self, 'name': key, 'change': old != value})
+
+    return property(getter, setter)
+
+
+def _add_aberration_properties(cls):
+    """
+    Internal function to add the properties of the aberration coefficients and their aliases to a class.
+    """
+    for symbol in polar_symbols:
+        setattr(cls, symbol, _make_property(symbol))
+
+    for key, value in polar_aliases.items():
+        if key != 'defocus':
+            setattr(cls, key, _make_property(value))
+
+
+_add_aberration_properties(CTF)
+
+
 def scherzer_defocus(Cs, energy):
     """
     Calculate the Scherzer defocus.
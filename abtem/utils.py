@@ -98,8 +98,12 @@ def spatial_frequencies(gpts: Tuple[int, int], sampling: Tuple[float, float]):
 def polar_coordinates(x, y):
     """Calculate a polar grid for a given Cartesian grid."""
     xp = get_array_module(x)
-    alpha = xp.sqrt(x.reshape((-1, 1)) ** 2 + y.reshape((1, -1)) ** 2)
-    phi = xp.arctan2(x.reshape((-1, 1)), y.reshape((1, -1)))
+    x = x.reshape((-1, 1))
+    y = y.reshape((1, -1))
+    # The squares are taken before broadcasting, such that only a single 2d array is allocated for the magnitude
+    alpha = x * x + y * y
+    xp.sqrt(alpha, out=alpha)
+    phi = xp.arctan2(x, y)
     return alpha, phi
 
 
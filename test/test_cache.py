@@ -61,6 +61,8 @@ def test_cached_method():
 
     assert dummy.method1('a') == 'aa'
     assert dummy.call_count == 4
+    assert dummy.cache.hits == 2
+    assert dummy.cache.misses == 4
 
     dummy.cache.clear()
     dummy.method1('a')
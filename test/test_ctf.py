@@ -2,6 +2,8 @@ import numpy as np
 import pytest
 
 from abtem.base_classes import energy2wavelength
+import abtem.transfer
+from abtem.device import asnumpy, cp
 from abtem.transfer import CTF, polar_aliases, scherzer_defocus, polar_symbols
 
 
@@ -61,3 +63,263 @@ def test_ctf_event():
     ctf = CTF(energy=80e3)
     ctf.semiangle_cutoff = 1
     assert ctf.event.notify_count == 2
+
+
+@pytest.mark.parametrize('symbols', [polar_symbols, ('C10', 'C23', 'phi23'), ('C30', 'C41', 'phi41', 'C56')])
+def test_fused_evaluate(symbols):
+    random_parameters = dict(zip(symbols, np.random.rand(len(symbols))))
+    ctf = CTF(semiangle_cutoff=20, rolloff=2, focal_spread=20, angular_spread=1, gaussian_spread=.5, energy=80e3,
+              parameters=random_parameters)
+
+    alpha = np.linspace(0, .03, 100)
+    phi = np.linspace(0, 2 * np.pi, 100)
+
+    expected = (ctf.evaluate_aberrations(alpha, phi) * ctf.evaluate_aperture(alpha) *
+                ctf.evaluate_temporal_envelope(alpha) * ctf.evaluate_spatial_envelope(alpha, phi) *
+                ctf.evaluate_gaussian_envelope(alpha))
+
+    assert np.allclose(ctf.evaluate(alpha, phi), expected, atol=1e-5)
+
+
+def test_evaluate_on_grid_cache():
+    ctf = CTF(energy=80e3, defocus=50)
+    array = ctf.evaluate_on_grid(gpts=64, extent=10)
+
+    ctf.defocus = 100
+    ctf.evaluate_on_grid(gpts=64, extent=10)
+    assert ctf._polar_coordinates_cache.hits == 1
+
+    ctf.defocus = 50
+    assert np.allclose(ctf.evaluate_on_grid(gpts=64, extent=10), array)
+
+    ctf.energy = 200e3
+    ctf.evaluate_on_grid(gpts=64, extent=10)
+    assert ctf._polar_coordinates_cache.hits == 2
+    assert ctf._polar_coordinates_cache.misses == 2
+
+    ctf.evaluate_on_grid(gpts=128, extent=10)
+    assert ctf._polar_coordinates_cache.hits == 2
+    assert ctf._polar_coordinates_cache.misses == 3
+
+
+@pytest.mark.parametrize('rolloff', [0., 2.])
+def test_radial_evaluate(rolloff):
+    ctf = CTF(semiangle_cutoff=30, rolloff=rolloff, focal_spread=30, angular_spread=.5, energy=200e3, defocus=50,
+              Cs=-1e5)
+
+    alpha, phi = ctf._polar_coordinates((512, 512), (.05, .05), ctf.wavelength, np)
+    array = ctf._evaluate_radial(alpha)
+    assert array is not None
+
+    ctf.C12 = 1e-12
+    assert np.allclose(array, ctf.evaluate(alpha, phi), atol=1e-4)
+
+
+def test_evaluate_precision():
+    ctf = CTF(semiangle_cutoff=20, rolloff=2, focal_spread=20, angular_spread=1, energy=80e3, defocus=1e4, C12=10)
+    alpha, phi = np.meshgrid(np.linspace(0, .03, 20), np.linspace(0, 2 * np.pi, 10))
+
+    assert ctf.evaluate(alpha.astype(np.float32), phi.astype(np.float32)).dtype == np.complex64
+    assert ctf.evaluate(alpha.astype(np.float32), 0.).dtype == np.complex64
+    assert ctf.evaluate_batch(alpha.astype(np.float32), phi, {'defocus': [0., 1.]}).dtype == np.complex128
+
+    array = ctf.evaluate(alpha, phi)
+    expected = ctf.evaluate_aberrations(alpha, phi) * ctf.evaluate_aperture(alpha) * \
+               ctf.evaluate_temporal_envelope(alpha) * ctf.evaluate_spatial_envelope(alpha, phi)
+
+    assert array.dtype == np.complex128
+    assert np.allclose(array, expected, rtol=0., atol=1e-12)
+
+
+def test_hard_aperture_edge():
+    ctf = CTF(energy=80e3, semiangle_cutoff=20, rolloff=0., C12=1.)
+    alpha = np.array([.019, .02, .021], dtype=np.float32)
+    assert np.allclose(np.abs(ctf.evaluate(alpha, 0.)), ctf.evaluate_aperture(alpha))
+
+
+@pytest.mark.parametrize('parameters', [{'defocus': 50}, {'defocus': 50, 'C12': 20}])
+def test_scalar_evaluate(parameters):
+    ctf = CTF(energy=80e3, **parameters)
+    assert np.isclose(ctf.evaluate(.01, 0.), ctf.evaluate_aberrations(.01, 0.))
+
+
+def test_cartesian_parameters():
+    ctf = CTF(energy=80e3, C12=10, phi12=np.pi / 4)
+    assert np.isclose(ctf.cartesian_parameters['C12a'], 0.)
+    assert np.isclose(ctf.cartesian_parameters['C12b'], 10.)
+
+    ctf.phi12 = 0.
+    assert np.isclose(ctf.cartesian_parameters['C12a'], 10.)
+
+    with pytest.raises(TypeError):
+        ctf.cartesian_parameters['C12a'] = 0.
+
+
+def test_parameters_read_only():
+    ctf = CTF(energy=80e3, C12=3, defocus=10)
+
+    with pytest.raises(TypeError):
+        ctf.parameters['C12'] = 0.
+
+    ctf.set_parameters({'C12': 0.})
+    assert ctf.parameters['C12'] == 0.
+    assert ctf.evaluate_chi(.01, 0.) == CTF(energy=80e3, defocus=10).evaluate_chi(.01, 0.)
+
+
+def test_set_parameters_raises():
+    ctf = CTF(energy=80e3, defocus=10)
+
+    with pytest.raises(ValueError):
+        ctf.set_parameters({'C12': 5., 'not_a_parameter': 1.})
+
+    assert ctf.C12 == 0.
+    assert ctf.cartesian_parameters['C12a'] == 0.
+    assert ctf.evaluate_chi(.01, 0.) == CTF(energy=80e3, defocus=10).evaluate_chi(.01, 0.)
+
+
+def test_parameters_from_ctf():
+    other = CTF(energy=80e3, C12=3, defocus=10)
+    parameters = dict(other.parameters)
+
+    ctf = CTF(energy=80e3, parameters=other.parameters, Cs=1e4)
+    assert ctf.C12 == 3
+    assert ctf.defocus == 10
+    assert ctf.Cs == 1e4
+    assert other.Cs == 0.
+    assert dict(other.parameters) == parameters
+
+    ctf = CTF(energy=80e3, parameters=parameters, Cs=1e4)
+    assert parameters['C30'] == 0.
+
+
+def test_evaluate_batch():
+    ctf = CTF(semiangle_cutoff=20, rolloff=2, focal_spread=20, angular_spread=1, energy=80e3, Cs=1e4, C12=10)
+    alpha, phi = np.meshgrid(np.linspace(0, .03, 20), np.linspace(0, 2 * np.pi, 10))
+    defocus = np.linspace(-100, 100, 5)
+    C23 = np.random.rand(5) * 100
+
+    array = ctf.evaluate_batch(alpha, phi, {'defocus': defocus, 'C23': C23})
+    assert array.shape == (5,) + alpha.shape
+
+    for i in range(len(defocus)):
+        ctf.set_parameters({'defocus': defocus[i], 'C23': C23[i]})
+        assert np.allclose(array[i], ctf.evaluate(alpha, phi), atol=1e-5)
+
+    out = np.zeros_like(array)
+    assert ctf.evaluate_batch(alpha, phi, {'defocus': defocus, 'C23': C23}, out=out) is out
+    assert np.allclose(out, array)
+
+
+def test_evaluate_empty():
+    ctf = CTF(semiangle_cutoff=20, focal_spread=20, energy=80e3, defocus=50, C12=10)
+    assert ctf.evaluate(np.zeros(0), np.zeros(0)).shape == (0,)
+    assert ctf.evaluate_batch(np.zeros(0), np.zeros(0), {'defocus': [0., 50.]}).shape == (2, 0)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('parameters', [{'defocus': 50, 'Cs': -1e5}, {'defocus': 50, 'C12': 20, 'C23': 1e3}])
+def test_spatial_envelope_numexpr(dtype, parameters, monkeypatch):
+    numexpr = pytest.importorskip('numexpr')
+    ctf = CTF(energy=80e3, angular_spread=10, **parameters)
+    alpha, phi = np.meshgrid(np.linspace(0, .03, 20, dtype=dtype), np.linspace(0, 2 * np.pi, 10, dtype=dtype))
+
+    num_threads = numexpr.set_num_threads(2)
+    try:
+        arrays = [ctf.evaluate_spatial_envelope(alpha, phi), ctf.evaluate_spatial_envelope(alpha, .5)]
+    finally:
+        numexpr.set_num_threads(num_threads)
+
+    monkeypatch.setattr(abtem.transfer, 'numexpr', None)
+    expected = [ctf.evaluate_spatial_envelope(alpha, phi), ctf.evaluate_spatial_envelope(alpha, .5)]
+
+    for array, expected_array in zip(arrays, expected):
+        assert array.dtype == expected_array.dtype == dtype
+        assert array.shape == expected_array.shape
+        assert np.allclose(array, expected_array, atol=1e-6)
+
+
+def random_aberrations():
+    # The magnitudes are chosen such that every radial order contributes a few radians of phase at 30 mrad
+    scales = {'1': 50., '2': 2e3, '3': 1e5, '4': 5e6, '5': 2e8}
+    return {symbol: np.random.rand() * (2 * np.pi if symbol.startswith('phi') else scales[symbol[1]])
+            for symbol in polar_symbols}
+
+
+@pytest.mark.gpu
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('envelopes', [{},
+                                       {'semiangle_cutoff': 25, 'rolloff': 0.},
+                                       {'semiangle_cutoff': 25, 'rolloff': 2, 'focal_spread': 20, 'angular_spread': 3,
+                                        'gaussian_spread': .5}])
+def test_evaluate_gpu(dtype, envelopes):
+    ctf = CTF(energy=80e3, parameters=random_aberrations(), **envelopes)
+    alpha, phi = np.meshgrid(np.linspace(0, .03, 64, dtype=dtype), np.linspace(0, 2 * np.pi, 64, dtype=dtype))
+
+    expected = ctf.evaluate(alpha, phi)
+    array = ctf.evaluate(cp.asarray(alpha), cp.asarray(phi))
+
+    assert type(array) is cp.ndarray
+    assert array.dtype == expected.dtype
+    assert np.allclose(asnumpy(array), expected, atol=1e-3 if dtype == np.float32 else 1e-10)
+
+
+@pytest.mark.gpu
+@pytest.mark.parametrize('rolloff', [0., 2.])
+def test_radial_evaluate_gpu(rolloff):
+    ctf = CTF(semiangle_cutoff=30, rolloff=rolloff, focal_spread=30, angular_spread=.5, energy=200e3, defocus=50,
+              Cs=-1e5)
+
+    alpha, phi = ctf._polar_coordinates((512, 512), (.05, .05), ctf.wavelength, np)
+    expected = ctf._evaluate_radial(alpha)
+    array = ctf._evaluate_radial(cp.asarray(alpha))
+
+    assert type(array) is cp.ndarray
+    assert np.allclose(asnumpy(array), expected, atol=1e-5)
+
+
+@pytest.mark.gpu
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_evaluate_batch_gpu(dtype):
+    ctf = CTF(semiangle_cutoff=25, rolloff=2, focal_spread=20, angular_spread=1, energy=80e3,
+              parameters=random_aberrations())
+    alpha, phi = np.meshgrid(np.linspace(0, .03, 64, dtype=dtype), np.linspace(0, 2 * np.pi, 64, dtype=dtype))
+    parameters = {'defocus': np.linspace(-100, 100, 5), 'C23': np.random.rand(5) * 2e3}
+
+    expected = ctf.evaluate_batch(alpha, phi, parameters)
+    array = ctf.evaluate_batch(cp.asarray(alpha), cp.asarray(phi), parameters)
+
+    assert type(array) is cp.ndarray
+    assert np.allclose(asnumpy(array), expected, atol=1e-3 if dtype == np.float32 else 1e-10)
+
+
+@pytest.mark.gpu
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('rolloff', [0., 2.])
+def test_evaluate_aperture_gpu(dtype, rolloff):
+    ctf = CTF(semiangle_cutoff=20, rolloff=rolloff, energy=80e3)
+    alpha = np.linspace(0, .03, 301, dtype=dtype)
+
+    array = ctf.evaluate_aperture(cp.asarray(alpha))
+
+    assert array.dtype == dtype
+    assert np.allclose(asnumpy(array), ctf.evaluate_aperture(alpha), atol=1e-6)
+
+
+@pytest.mark.gpu
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_evaluate_aberrations_gpu(dtype):
+    ctf = CTF(energy=80e3, parameters=random_aberrations())
+    alpha, phi = np.meshgrid(np.linspace(0, .03, 64, dtype=dtype), np.linspace(0, 2 * np.pi, 64, dtype=dtype))
+
+    expected = ctf.evaluate_aberrations(alpha, phi)
+    array = ctf.evaluate_aberrations(cp.asarray(alpha), cp.asarray(phi))
+
+    assert array.dtype == expected.dtype
+    assert np.allclose(asnumpy(array), expected, atol=1e-3 if dtype == np.float32 else 1e-10)
+
+
+@pytest.mark.gpu
+def test_evaluate_empty_gpu():
+    ctf = CTF(semiangle_cutoff=20, focal_spread=20, energy=80e3, defocus=50, C12=10)
+    assert ctf.evaluate(cp.zeros(0), cp.zeros(0)).shape == (0,)
+    assert ctf.evaluate_batch(cp.zeros(0), cp.zeros(0), {'defocus': [0., 50.]}).shape == (2, 0)